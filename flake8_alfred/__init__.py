@@ -3,7 +3,9 @@
 __all__ = ["SymbolsVisitor", "WarnSymbols"]
 
 from ast import AST
-from typing import Any, Dict, Iterator, Optional, Tuple
+from threading import local
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 from pkg_resources import get_distribution
 from .symbols import SymbolsVisitor
@@ -12,10 +14,22 @@ from .symbols import SymbolsVisitor
 # Flake8 error type: (line number, column, warning message, caller type)
 FlakeError = Tuple[int, int, str, type]
 
+# One visitor per thread, reused (after a reset) across all checked files to
+# amortize its construction.
+_THREAD = local()
+
 
 class WarnSymbols:
     """The flake8 plugin itself."""
+    __slots__ = ("_tree",)
+
     BANNED: Dict[str, str] = {}
+    BANNED_ROOTS: FrozenSet[str] = frozenset()
+    # Trie of the banned symbols keyed by dotted-path component; the warning
+    # of a banned prefix ending at a given node is stored under the None key.
+    # Exposed read-only: run() never writes class state, so instances are
+    # safe to fork or spawn into flake8's --jobs worker pool.
+    BANNED_TRIE: Mapping[Optional[str], Any] = MappingProxyType({})
 
     # The name and version class variables are required by flake8. It also
     # requires add_options and parse_options for options handling.
@@ -43,24 +57,51 @@ class WarnSymbols:
             symbol, _, warning = line.partition("=")
             cls.BANNED[symbol.strip()] = warning.strip()
         cls.BANNED.pop("", None)
-
-    def run(self) -> Iterator[FlakeError]:
-        """Run the plugin."""
-        visitor = SymbolsVisitor()
-        for symbol, node in visitor.visit(self._tree):
-            # Get the warning associated to the most specific module name.
-            warning: Optional[str] = None
-            for module in submodules(symbol):
-                warning = self.BANNED.get(module, warning)
+        cls.BANNED_ROOTS = frozenset(
+            symbol.partition(".")[0] for symbol in cls.BANNED
+        )
+        trie: Dict[Optional[str], Any] = {}
+        for symbol, warning in cls.BANNED.items():
+            node = trie
+            for part in symbol.split("."):
+                node = node.setdefault(part, {})
+            node[None] = warning
+        cls.BANNED_TRIE = MappingProxyType(trie)
+
+    def run(self) -> List[FlakeError]:
+        """Run the plugin, returning the errors found in the tree."""
+        # Nothing is banned when the plugin is installed but not configured:
+        # don't even walk the tree.
+        errors: List[FlakeError] = []
+        if not self.BANNED:
+            return errors
+        # The visitor filters on the banned root modules itself, so symbols
+        # that cannot possibly match are never even emitted.
+        visitor: Optional[SymbolsVisitor] = getattr(_THREAD, "visitor", None)
+        if visitor is None:
+            visitor = _THREAD.visitor = SymbolsVisitor(self.BANNED_ROOTS)
+        else:
+            visitor.roots = self.BANNED_ROOTS
+        # A file typically references the same symbol many times: remember
+        # the warning resolved for each one (None when it's not banned).
+        warnings: Dict[str, Optional[str]] = {}
+        for symbol, lineno, col_offset in visitor.visit_tree(self._tree):
+            if symbol in warnings:
+                warning = warnings[symbol]
+            else:
+                # Walk the trie to get the warning associated to the most
+                # specific banned prefix of the symbol, if any.
+                warning = None
+                trie = self.BANNED_TRIE
+                for part in symbol.split("."):
+                    child = trie.get(part)
+                    if child is None:
+                        break
+                    warning = child.get(None, warning)
+                    trie = child
+                warnings[symbol] = warning
             # If there's no associated warning, it means the symbol is valid.
-            if warning is None:
-                continue
-            # Otherwise, we yield an error.
-            yield (node.lineno, node.col_offset, f"B1 {warning}", type(self))
-
-
-def submodules(symbol: str) -> Iterator[str]:
-    """submodules("a.b.c") yields "a", then "a.b", then "a.b.c"."""
-    bits = symbol.split(".")
-    for i in range(len(bits)):
-        yield ".".join(bits[:i+1])
+            if warning is not None:
+                message = f"B1 {warning}"
+                errors.append((lineno, col_offset, message, type(self)))
+        return errors
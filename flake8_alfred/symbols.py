@@ -8,38 +8,95 @@ from ast import (
     # Special
     arg, arguments, comprehension, ExceptHandler, expr, stmt,
     # Statements
-    AsyncFunctionDef, ClassDef, FunctionDef, Import, ImportFrom,
+    AsyncFunctionDef, Break, ClassDef, Continue, FunctionDef, Global, Import,
+    ImportFrom, Nonlocal, Pass,
     # Expressions
-    Attribute, DictComp, GeneratorExp, Lambda, ListComp, Name, SetComp,
+    Attribute, Constant, DictComp, GeneratorExp, Lambda, ListComp, Name,
+    SetComp,
     # Expression context
-    Del, Param, Store,
-    # Visitors
-    iter_child_nodes
+    Del, Load, Param, Store, expr_context
 )
 
 from typing import (
-    Any, ChainMap as ChainMapT, Iterable, Iterator, Mapping, Optional,
-    Tuple, TypeVar, Union
+    Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
 )
 
-from collections import ChainMap
-from contextlib import contextmanager
+from sys import intern
 
 from .visitor import Visitor
 
 
-A = TypeVar("A")
-B = TypeVar("B")
-
 Function = Union[AsyncFunctionDef, FunctionDef]
-ScopeT = ChainMapT[str, Optional[str]]
-Symbols = Iterable[Tuple[str, Union[expr, stmt]]]
+Symbols = List[Tuple[str, int, int]]
 UnaryComp = Union[GeneratorExp, ListComp, SetComp]
 
+# Sentinel recorded in the undo log for names that were unbound.
+_UNBOUND = object()
+
+# Expression contexts under which a Name gets (re)bound or unbound. A Name
+# ctx is always an instance of one of the exact expr_context classes, so an
+# identity-based set probe is enough and cheaper than isinstance.
+_WRITE_CTX = frozenset((Del, Param, Store))
+
+# Cache of node class -> ((field name, field holds a list), ...), filled
+# lazily from the first instance of each class that generic_visit sees.
+_FIELDS: Dict[type, Tuple[Tuple[str, bool], ...]] = {}
+
+# Initial scope, built once at import time: each builtin name is an alias of
+# itself ("print" resolves to "print") until it's overwritten.
+_BUILTINS: Dict[str, Optional[str]] = {name: name for name in dir(builtins)}
+
+
+def _classify_fields(node: AST) -> Tuple[Tuple[str, bool], ...]:
+    """Classify the fields of a node class as list-valued or not. Whether a
+    field holds a list is fixed by the AST grammar, so classifying one sample
+    instance is valid for every instance of its class.
+    """
+    return tuple(
+        (name, isinstance(getattr(node, name, None), list))
+        for name in node._fields
+    )
+
+
+class Scopes:
+    """Mapping of names to qualified names, with lexical scoping. The bindings
+    of every scope live in a single flat dict, so lookups are one dict probe
+    instead of a walk over the enclosing scopes. Entering a scope pushes an
+    undo log; writes record the previous binding so that leaving the scope
+    restores it.
+    """
+    __slots__ = ("_current", "_undo")
+
+    def __init__(self, init: Mapping[str, Optional[str]]) -> None:
+        self._current: Dict[str, Optional[str]] = dict(init)
+        self._undo: List[List[Tuple[str, Any]]] = []
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the binding of `key`, or None if there is none."""
+        return self._current.get(key)
+
+    def __setitem__(self, key: str, value: Optional[str]) -> None:
+        if self._undo:
+            self._undo[-1].append((key, self._current.get(key, _UNBOUND)))
+        self._current[key] = value
+
+    def push(self) -> None:
+        """Enter a new scope."""
+        self._undo.append([])
+
+    def pop(self) -> None:
+        """Leave the current scope, restoring the bindings it overwrote."""
+        for key, old in reversed(self._undo.pop()):
+            if old is _UNBOUND:
+                self._current.pop(key, None)
+            else:
+                self._current[key] = old
+
 
-class SymbolsVisitor(Visitor[AST, Symbols]):
-    """SymbolsVisitor.visit yields a pair (qualified_name, node) for all
-    qualified names it finds in the given AST.
+class SymbolsVisitor(Visitor[AST, None]):
+    """SymbolsVisitor.visit appends a triple (qualified_name, lineno,
+    col_offset) to SymbolsVisitor.out for all qualified names it finds in the
+    given AST.
 
     It does handle:
         - Imports: Importing an obsolete symbol will yield it;
@@ -53,203 +110,329 @@ class SymbolsVisitor(Visitor[AST, Symbols]):
     operator untrack the symbol if it's on the left hand side, no matter what's
     on the right hand side.
     """
-    def __init__(self) -> None:
-        # Load names from the builtins module into self.scopes. If they are
-        # not overwritten, each builtin name is an alias of itself
-        # (self.scopes["print"] == "print")
-        init = dir(builtins)
-        self.scopes: ScopeT = ChainMap(dict(zip(init, init)))
-
-    @contextmanager
-    def scope(self) -> Iterator[Mapping[str, Optional[str]]]:
-        """Context manager that create a new scope (that is, add a mapping into
-        self.scopes) and delete it on exit.
+    __slots__ = ("scopes", "out", "roots")
+
+    def __init__(self, roots: Optional[FrozenSet[str]] = None) -> None:
+        self.scopes = Scopes(_BUILTINS)
+        self.out: Symbols = []
+        # When given, only symbols whose root module belongs to this set are
+        # emitted. Scope tracking is not affected.
+        self.roots = roots
+
+    def reset(self, roots: Optional[FrozenSet[str]] = None) -> None:
+        """Restore the visitor to its initial state so it can be reused on
+        another tree.
         """
-        self.scopes = self.scopes.new_child()
-        try:
-            yield self.scopes.maps[0]
-        finally:
-            self.scopes = self.scopes.parents
-
-    def generic_visit(self, node: AST) -> Symbols:
-        """Equivalent to ast.NodeVisitor.visit, except it chains the returned
-        iterators.
+        self.scopes = Scopes(_BUILTINS)
+        self.out = []
+        self.roots = roots
+
+    def visit_tree(self, tree: AST) -> Symbols:
+        """One-shot entry point: visit a whole tree from a fresh state and
+        return the symbols found in it. Returning the accumulator list lets
+        callers iterate it with a C-level list iterator instead of driving a
+        generator across the module boundary.
         """
-        for child in iter_child_nodes(node):
-            yield from self.visit(child)
+        self.reset(self.roots)
+        self.visit(tree)
+        return self.out
+
+    def emit(self, symbol: str, node: Union[expr, stmt]) -> None:
+        """Append a symbol and the position of its node to self.out, unless
+        root filtering is active and the symbol's root module is not
+        interesting. Only the position is kept, so emitting doesn't extend
+        the lifetime of the visited subtree.
+        """
+        roots = self.roots
+        if roots is None or symbol.partition(".")[0] in roots:
+            self.out.append((symbol, node.lineno, node.col_offset))
+
+    def generic_visit(self, node: AST) -> None:
+        """Equivalent to ast.NodeVisitor.generic_visit: visit the children of
+        an unregistered node. Runs of unregistered nodes are expanded onto an
+        explicit stack in depth-first order rather than recursing one Python
+        frame per node; registered handlers are dispatched as usual when
+        uncovered. The fields of each node class are classified once in
+        _FIELDS instead of going through ast.iter_child_nodes.
+        """
+        cls = type(self)
+        cache = cls.dispatch_cache
+        generic = cls.generic_visit
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            function = cache.get(type(current))
+            if function is None:
+                function = cache[type(current)] = self.resolve(type(current))
+            if function is not generic:
+                function(self, current)
+                continue
+            fields = _FIELDS.get(type(current))
+            if fields is None:
+                fields = _FIELDS[type(current)] = _classify_fields(current)
+            children: List[AST] = []
+            for name, is_list in fields:
+                value = getattr(current, name, None)
+                if is_list and value is not None:
+                    for item in value:
+                        if isinstance(item, AST):
+                            children.append(item)
+                elif isinstance(value, AST):
+                    children.append(value)
+            stack.extend(reversed(children))
 
 
 # HELPERS
 
 
-def visit_arguments_defaults(vtor: SymbolsVisitor, node: arguments) -> Symbols:
+def visit_arguments_defaults(vtor: SymbolsVisitor, node: arguments) -> None:
     """Visit the default values of function/lambda arguments."""
-    # kw_defaults is None for keywords-only arguments, and since None is not an
-    # AST subclass, this visitor should not visit it.
-    yield from visit_iterable(vtor, filter(None, node.kw_defaults))
-    yield from visit_iterable(vtor, node.defaults)
+    # kw_defaults holds None for keywords-only arguments without a default,
+    # and since None is not an AST node, this visitor should not visit it.
+    for default in node.kw_defaults:
+        if default is not None:
+            vtor.visit(default)
+    for default in node.defaults:
+        vtor.visit(default)
 
 
-def visit_arguments_names(vtor: SymbolsVisitor, node: arguments) -> Symbols:
+def visit_arguments_names(vtor: SymbolsVisitor, node: arguments) -> None:
     """Visit the arguments names and annotations."""
-    yield from visit_iterable(vtor, node.kwonlyargs)
-    yield from visit_iterable(vtor, node.args)
-    yield from visit_optional(vtor, node.kwarg)
-    yield from visit_optional(vtor, node.vararg)
-
-
-def visit_optional(
-        vtor: Visitor[A, Iterable[B]],
-        node: Optional[A]
-) -> Iterable[B]:
-    """Visit an optional node."""
-    if node is not None:
-        yield from vtor.visit(node)
-
-
-def visit_iterable(
-        vtor: Visitor[Any, Iterable[B]],
-        node: Iterable[Any]
-) -> Iterable[B]:
-    """Visit a sequence/list of nodes."""
-    for item in node:
-        yield from vtor.visit(item)
+    for item in node.kwonlyargs:
+        vtor.visit(item)
+    for item in node.args:
+        vtor.visit(item)
+    if node.kwarg is not None:
+        vtor.visit(node.kwarg)
+    if node.vararg is not None:
+        vtor.visit(node.vararg)
+
+
+# LEAVES
+
+
+@SymbolsVisitor.on(Break)
+@SymbolsVisitor.on(Constant)
+@SymbolsVisitor.on(Continue)
+@SymbolsVisitor.on(expr_context)
+@SymbolsVisitor.on(Global)
+@SymbolsVisitor.on(Nonlocal)
+@SymbolsVisitor.on(Pass)
+def visit_leaf(vtor: SymbolsVisitor, node: AST) -> None:
+    """Nodes that cannot contain a qualified name: cut the subtree. Global
+    and nonlocal belong here because their names are plain identifiers, and
+    this visitor doesn't track them anyway.
+    """
 
 
 # SPECIAL
 
 
 @SymbolsVisitor.on(arg)
-def visit_arg(vtor: SymbolsVisitor, node: arg) -> Symbols:
+def visit_arg(vtor: SymbolsVisitor, node: arg) -> None:
     """Visit the annotation if any, remove the symbol from the context."""
-    yield from visit_optional(vtor, node.annotation)
+    if node.annotation is not None:
+        vtor.visit(node.annotation)
     vtor.scopes[node.arg] = None
 
 
 @SymbolsVisitor.on(arguments)
-def visit_arguments(vtor: SymbolsVisitor, node: arguments) -> Symbols:
+def visit_arguments(vtor: SymbolsVisitor, node: arguments) -> None:
     """Visit the defaults values first, then the arguments names."""
-    yield from visit_arguments_defaults(vtor, node)
-    yield from visit_arguments_names(vtor, node)
+    visit_arguments_defaults(vtor, node)
+    visit_arguments_names(vtor, node)
 
 
 @SymbolsVisitor.on(comprehension)
-def visit_comprehension(vtor: SymbolsVisitor, node: comprehension) -> Symbols:
+def visit_comprehension(vtor: SymbolsVisitor, node: comprehension) -> None:
     """Visit the iterable expression, then the target name, then the
     predicates.
     """
-    yield from vtor.visit(node.iter)
-    yield from vtor.visit(node.target)
-    yield from visit_iterable(vtor, node.ifs)
+    vtor.visit(node.iter)
+    vtor.visit(node.target)
+    for predicate in node.ifs:
+        vtor.visit(predicate)
 
 
 @SymbolsVisitor.on(ExceptHandler)
-def visit_except_handler(vtor: SymbolsVisitor, node: ExceptHandler) -> Symbols:
+def visit_except_handler(vtor: SymbolsVisitor, node: ExceptHandler) -> None:
     """Visit the exception type, remove the alias from the context then
     visit the body.
     """
-    yield from visit_optional(vtor, node.type)
+    if node.type is not None:
+        vtor.visit(node.type)
     if node.name is not None:
         vtor.scopes[node.name] = None
-    yield from visit_iterable(vtor, node.body)
+    for statement in node.body:
+        vtor.visit(statement)
 
 
 # STATEMENTS
 
 
 @SymbolsVisitor.on(ClassDef)
-def visit_class_def(vtor: SymbolsVisitor, node: ClassDef) -> Symbols:
+def visit_class_def(vtor: SymbolsVisitor, node: ClassDef) -> None:
     """Visit in the following order:
         Decorators; Base classes; Keywords; Remove name from context; Body.
     """
-    yield from visit_iterable(vtor, node.decorator_list)
-    yield from visit_iterable(vtor, node.bases)
-    yield from visit_iterable(vtor, node.keywords)
+    for decorator in node.decorator_list:
+        vtor.visit(decorator)
+    for base in node.bases:
+        vtor.visit(base)
+    for keyword in node.keywords:
+        vtor.visit(keyword)
     vtor.scopes[node.name] = None
-    with vtor.scope():
-        yield from visit_iterable(vtor, node.body)
+    vtor.scopes.push()
+    try:
+        for statement in node.body:
+            vtor.visit(statement)
+    finally:
+        vtor.scopes.pop()
 
 
 @SymbolsVisitor.on(AsyncFunctionDef)
 @SymbolsVisitor.on(FunctionDef)
-def visit_function(vtor: SymbolsVisitor, node: Function) -> Symbols:
+def visit_function(vtor: SymbolsVisitor, node: Function) -> None:
     """Visit a function definition in the following order:
         Decorators; Return annotation; Arguments default values;
         Remove name from context; Arguments names; Function body.
     """
-    yield from visit_iterable(vtor, node.decorator_list)
-    yield from visit_optional(vtor, node.returns)
-    yield from visit_arguments_defaults(vtor, node.args)
+    for decorator in node.decorator_list:
+        vtor.visit(decorator)
+    if node.returns is not None:
+        vtor.visit(node.returns)
+    visit_arguments_defaults(vtor, node.args)
     vtor.scopes[node.name] = None
-    with vtor.scope():
-        yield from visit_arguments_names(vtor, node.args)
-        yield from visit_iterable(vtor, node.body)
+    vtor.scopes.push()
+    try:
+        visit_arguments_names(vtor, node.args)
+        for statement in node.body:
+            vtor.visit(statement)
+    finally:
+        vtor.scopes.pop()
 
 
 @SymbolsVisitor.on(Import)
-def visit_import(vtor: SymbolsVisitor, node: Import) -> Symbols:
+def visit_import(vtor: SymbolsVisitor, node: Import) -> None:
     """Add the module to the current context."""
     for alias in node.names:
-        vtor.scopes[alias.asname or alias.name] = alias.name
-        yield (alias.name, node)
+        # Imported names recur across the files of a project: intern them so
+        # later dict lookups hash once and compare by identity.
+        qualified = intern(alias.name)
+        vtor.scopes[intern(alias.asname or alias.name)] = qualified
+        vtor.emit(qualified, node)
 
 
 @SymbolsVisitor.on(ImportFrom)
-def visit_import_from(vtor: SymbolsVisitor, node: ImportFrom) -> Symbols:
+def visit_import_from(vtor: SymbolsVisitor, node: ImportFrom) -> None:
     """Add the symbols to the current context."""
     for alias in node.names:
         module = node.module or ""
-        qualified = f"{module}.{alias.name}"
-        vtor.scopes[alias.asname or alias.name] = qualified
-        yield (qualified, node)
+        qualified = intern(f"{module}.{alias.name}")
+        vtor.scopes[intern(alias.asname or alias.name)] = qualified
+        vtor.emit(qualified, node)
 
 
 # EXPRESSIONS
 
 
 @SymbolsVisitor.on(Attribute)
-def visit_attribute(vtor: SymbolsVisitor, node: Attribute) -> Symbols:
-    """Postfix the seen symbols."""
-    for lhs, _ in vtor.visit(node.value):
-        yield (f"{lhs}.{node.attr}", node)
+def visit_attribute(vtor: SymbolsVisitor, node: Attribute) -> None:
+    """Postfix the symbols found in the value expression. Chains rooted on a
+    plain Name (the common case, e.g. os.path.join) are resolved with a
+    single iterative climb and one join, instead of rebuilding the prefix at
+    every nesting level.
+    """
+    attrs = [node.attr]
+    value = node.value
+    while type(value) is Attribute:
+        attrs.append(value.attr)
+        value = value.value
+    if type(value) is Name:
+        scopes = vtor.scopes
+        if type(value.ctx) in _WRITE_CTX:
+            scopes[value.id] = None
+        base = scopes.get(value.id)
+        if base is not None:
+            attrs.append(base)
+            attrs.reverse()
+            vtor.emit(".".join(attrs), node)
+        return
+    # Exotic bases (calls, subscripts, ...): visit the value expression and
+    # postfix whatever it produced.
+    mark = len(vtor.out)
+    vtor.visit(node.value)
+    vtor.out[mark:] = [
+        (f"{lhs}.{node.attr}", node.lineno, node.col_offset)
+        for lhs, _, _ in vtor.out[mark:]
+    ]
 
 
 @SymbolsVisitor.on(DictComp)
-def visit_dict_comp(vtor: SymbolsVisitor, node: DictComp) -> Symbols:
+def visit_dict_comp(vtor: SymbolsVisitor, node: DictComp) -> None:
     """Same as visit_unary_comp, except here we have a key and a value."""
-    with vtor.scope():
-        yield from visit_iterable(vtor, node.generators)
-        yield from vtor.visit(node.key)
-        yield from vtor.visit(node.value)
+    vtor.scopes.push()
+    try:
+        for generator in node.generators:
+            vtor.visit(generator)
+        vtor.visit(node.key)
+        vtor.visit(node.value)
+    finally:
+        vtor.scopes.pop()
 
 
 @SymbolsVisitor.on(Lambda)
-def visit_lambda(vtor: SymbolsVisitor, node: Lambda) -> Symbols:
+def visit_lambda(vtor: SymbolsVisitor, node: Lambda) -> None:
     """Visit the arguments first, then the body."""
-    with vtor.scope():
-        yield from vtor.visit(node.args)
-        yield from vtor.visit(node.body)
+    vtor.scopes.push()
+    try:
+        vtor.visit(node.args)
+        vtor.visit(node.body)
+    finally:
+        vtor.scopes.pop()
 
 
 @SymbolsVisitor.on(Name)
-def visit_name(vtor: SymbolsVisitor, node: Name) -> Symbols:
+def visit_name(vtor: SymbolsVisitor, node: Name) -> None:
     """If the symbol is getting overwritten, then delete it from the context,
-    else yield it if it's known in this context.
+    else emit it if it's known in this context. A Name in Load context — the
+    overwhelmingly common case — only needs the lookup.
     """
-    if isinstance(node.ctx, (Del, Param, Store)):
+    ctx = type(node.ctx)
+    if ctx is Load:
+        name = vtor.scopes.get(node.id)
+        if name is not None:
+            vtor.emit(name, node)
+    elif ctx in _WRITE_CTX:
         vtor.scopes[node.id] = None
-    name = vtor.scopes.get(node.id)
-    if name is not None:
-        yield (name, node)
 
 
 @SymbolsVisitor.on(GeneratorExp)
 @SymbolsVisitor.on(ListComp)
 @SymbolsVisitor.on(SetComp)
-def visit_unary_comp(vtor: SymbolsVisitor, node: UnaryComp) -> Symbols:
+def visit_unary_comp(vtor: SymbolsVisitor, node: UnaryComp) -> None:
     """Visit the generators expressions, then the left element, the whole being
     wrapped into a new context.
     """
-    with vtor.scope():
-        yield from visit_iterable(vtor, node.generators)
-        yield from vtor.visit(node.elt)
+    vtor.scopes.push()
+    try:
+        for generator in node.generators:
+            vtor.visit(generator)
+        vtor.visit(node.elt)
+    finally:
+        vtor.scopes.pop()
+
+
+# Pre-resolve the dispatch of every ast class (handlers were all registered
+# above) so that even the first tree visited pays no MRO walk.
+
+
+def _prime_dispatch(vtor: SymbolsVisitor, cls: type) -> None:
+    """Fill the dispatch cache for every subclass of `cls`."""
+    cache = SymbolsVisitor.dispatch_cache
+    for subclass in cls.__subclasses__():
+        cache.setdefault(subclass, vtor.resolve(subclass))
+        _prime_dispatch(vtor, subclass)
+
+
+_prime_dispatch(SymbolsVisitor(), AST)
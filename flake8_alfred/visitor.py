@@ -1,10 +1,7 @@
 """Generic implementation of the Visitor and Dispatcher patterns."""
 
-from collections import ChainMap
-
 from typing import (
-    Any, Callable, ChainMap as ChainMapT, Dict,
-    Generic, Hashable, Tuple, Type, TypeVar
+    Any, Callable, Dict, Generic, Hashable, Tuple, Type, TypeVar
 )
 
 
@@ -20,14 +17,25 @@ class RegisterMeta(type):
     """
     @classmethod
     def __prepare__(cls, name: str, bases: Tuple[Type], **kwargs: Any) -> Dict:
-        dicts = (base.shared_dict for base in bases if isinstance(base, cls))
-        return {"_shared_dict": ChainMap(*dicts).new_child()}
+        # Merge the bases' dicts into a single flat dict, so lookups are one
+        # C-level probe instead of a chain walk. The first base shadows the
+        # following ones, like a ChainMap would.
+        shared: Dict = {}
+        for base in reversed(bases):
+            if isinstance(base, cls):
+                shared.update(base.shared_dict)
+        return {"_shared_dict": shared, "_dispatch_cache": {}}
 
     @property
-    def shared_dict(cls) -> ChainMapT:
+    def shared_dict(cls) -> Dict:
         """Returns the class shared dict."""
         return cls._shared_dict  # type: ignore
 
+    @property
+    def dispatch_cache(cls) -> Dict:
+        """Returns the class dispatch cache."""
+        return cls._dispatch_cache  # type: ignore
+
 
 # This class is useless since python 3.7 because GenericMeta was removed in
 # that version and Generic is now an instance of type. Before that this class
@@ -40,6 +48,8 @@ class GenericRegisterMeta(RegisterMeta, type(Generic)):  # type: ignore
 
 class Dispatcher(Generic[A, B], metaclass=GenericRegisterMeta):
     """Dispatcher base class."""
+    __slots__ = ()
+
     def dispatch(self, key: A) -> B:
         """Returns the item associated with `key` or raise `KeyError`."""
         return type(self).shared_dict[key]
@@ -49,12 +59,16 @@ class Dispatcher(Generic[A, B], metaclass=GenericRegisterMeta):
         """Register a value into the `shared_dict` class attribute."""
         def _wrapper(value: C) -> C:
             cls.shared_dict[key] = value
+            # Resolutions memoized before this registration may be stale.
+            cls.dispatch_cache.clear()
             return value
         return _wrapper
 
 
 class Visitor(Dispatcher[Type[A], Callable[["Visitor[A, B]", A], B]]):
     """Visitor base class."""
+    __slots__ = ()
+
     def generic_visit(self, node: A) -> B:
         """Generic visitor for nodes of unknown type. The default
         implementation raises a TypeError.
@@ -63,13 +77,22 @@ class Visitor(Dispatcher[Type[A], Callable[["Visitor[A, B]", A], B]]):
 
     def visit(self, node: A) -> B:
         """Visits a node by calling the registered function for this type of
-        nodes.
+        nodes. The function resolved for a given node type is cached on the
+        visitor class, so the MRO is only walked on the first encounter.
+        """
+        cache = type(self).dispatch_cache
+        function = cache.get(type(node))
+        if function is None:
+            function = cache[type(node)] = self.resolve(type(node))
+        return function(self, node)
+
+    def resolve(self, nodetype: Type[A]) -> Callable[["Visitor[A, B]", A], B]:
+        """Walk the MRO of `nodetype` and return the first registered
+        function, falling back on `generic_visit`.
         """
-        for base in type(node).mro():
-            try:
-                function = self.dispatch(base)
-            except KeyError:
-                pass
-            else:
-                return function(self, node)
-        return self.generic_visit(node)
+        shared = type(self).shared_dict
+        for base in nodetype.mro():
+            function = shared.get(base)
+            if function is not None:
+                return function
+        return type(self).generic_visit
@@ -2,11 +2,14 @@
 of (line, expectation) where line is a line of code and expectation is a
 collection of symbols we expect to encounter in the former.
 
-The tests are grouped together into TESTS and evaluated by test_visitor.
+The tests are grouped together into TESTS and test_visitor is parametrized
+over them, so each case reports (and can run) on its own.
 """
 
 from ast import parse
-from typing import Collection, Sequence, Tuple
+from typing import Collection, Mapping, Sequence, Tuple
+
+import pytest
 
 from flake8_alfred import SymbolsVisitor
 
@@ -95,36 +98,36 @@ TEST_OVERWRITE: T = (
     ("    a = d               ", ("m.d",))
 )
 
-TESTS: Collection[T] = (
-    TEST_ALIAS,
-    TEST_ANNOTATIONS,
-    TEST_COMPREHENSION,
-    TEST_DELETE,
-    TEST_EXCEPT,
-    TEST_HEADER,
-    TEST_IMPORT,
-    TEST_LAMBDA,
-    TEST_OVERWRITE,
-)
+TESTS: Mapping[str, T] = {
+    "alias": TEST_ALIAS,
+    "annotations": TEST_ANNOTATIONS,
+    "comprehension": TEST_COMPREHENSION,
+    "delete": TEST_DELETE,
+    "except": TEST_EXCEPT,
+    "header": TEST_HEADER,
+    "import": TEST_IMPORT,
+    "lambda": TEST_LAMBDA,
+    "overwrite": TEST_OVERWRITE,
+}
+
+
+@pytest.mark.parametrize("test", TESTS.values(), ids=TESTS.keys())
+def test_visitor(test: T) -> None:
+    """Build an AST from the given test, compare the actual output with the
+    expected output.
+    """
+    # Transpose test. We now have a sequence of code lines, and another for
+    # expected symbols on a given line.
+    lines, symset = zip(*test)
 
+    # Concat the code lines, separating them by a newline, and visit the
+    # resulting code.
+    parsed = parse("\n".join(lines))
+    results = SymbolsVisitor().visit_tree(parsed)
 
-def test_visitor() -> None:
-    """Build an AST from the tests in TESTS, compare the actual output with
-    the expected output.
-    """
-    for test in TESTS:
-        # Transpose test. We now have a sequence of code lines, and another for
-        # expected symbols on a given line.
-        lines, symset = zip(*test)
-
-        # Concat the code lines, separating them by a newline, and visit the
-        # resulting code.
-        parsed = parse("\n".join(lines))
-        results = SymbolsVisitor().visit(parsed)
-
-        # Build a set of (line, expected symbols) from symset.
-        # symbols is the actual output.
-        expect = {(l+1, n) for l, s in enumerate(symset) for n in s}
-        symbols = {(node.lineno, name) for name, node in results}
-
-        assert symbols == expect
+    # Build a set of (line, expected symbols) from symset.
+    # symbols is the actual output.
+    expect = {(l+1, n) for l, s in enumerate(symset) for n in s}
+    symbols = {(lineno, name) for name, lineno, _ in results}
+
+    assert symbols == expect